@@ -46,6 +46,25 @@ def create_table(conn: sqlite3.Connection, query: str) -> None:
         print(f'Error: {e}')
 
 
+def create_index(conn: sqlite3.Connection, query: str) -> None:
+    """Creates an index in the specified SQLite database connection.
+
+    Parameters:
+        conn (sqlite3.Connection): The database connection object to create the index in.
+        query (str): The SQL query string to create the index.
+
+    Returns:
+        None
+    """
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(query)
+            print('Index has been created in the database')
+    except Exception as e:
+        print(f'Error: {e}')
+
+
 def main(db_file):
     create_data_query = f""" 
         CREATE TABLE IF NOT EXISTS data (
@@ -62,11 +81,14 @@ def main(db_file):
             footnote_codes TEXT, 
             FOREIGN KEY (area_code) REFERENCES areas(area_code),
             FOREIGN KEY (item_code) REFERENCES items(item_code), 
-            FOREIGN KEY (period) REFERENCES periods(period),
-            UNIQUE(series_id, year, period)
+            FOREIGN KEY (period) REFERENCES periods(period)
         )
     """
 
+    create_data_unique_index_query = f""" 
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_series_year_period ON data (series_id, year, period)
+    """
+
     create_periods_query = f""" 
         CREATE TABLE IF NOT EXISTS periods (
             period TEXT NOT NULL PRIMARY KEY,
@@ -98,6 +120,7 @@ def main(db_file):
     conn = create_sqlite_connection(db_file)
     if conn:
         create_table(conn=conn, query=create_data_query)
+        create_index(conn=conn, query=create_data_unique_index_query)
         create_table(conn=conn, query=create_items_query)
         create_table(conn=conn, query=create_periods_query)
         create_table(conn=conn, query=create_areas_query)
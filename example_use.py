@@ -8,7 +8,7 @@ import pandas as pd
 def main(db_file):
     example_query = """
         SELECT * 
-        FROM data_view
+        FROM data_denorm
         WHERE 
             area_code = '0000' AND 
             item_code = 'SA0'
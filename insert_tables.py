@@ -1,62 +1,132 @@
 #!/usr/bin/python
 
+import mmap
 import os
 import sqlite3
-import urllib.request
-import pandas as pd
-from io import StringIO
+import tempfile
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain, islice
 
-def read_text_from_url(url: str) -> str:
+HTTP_TIMEOUT = 60
+ROWS_PER_STATEMENT = 500
+MAX_VARIABLE_NUMBER = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+DATA_COLS = ('id', 'series_id', 'prefix', 'seasonal', 'periodicity', 'area_code', 'item_code', 'year', 'period', 'value', 'footnote_codes')
+DATA_INDEXES = {
+    'idx_series_year_period': "CREATE UNIQUE INDEX IF NOT EXISTS idx_series_year_period ON data (series_id, year, period)",
+    'idx_data_area_item': "CREATE INDEX IF NOT EXISTS idx_data_area_item ON data (area_code, item_code, year, period)",
+}
+DEDUPLICATE_DATA_QUERY = """
+    DELETE FROM data WHERE rowid NOT IN (
+        SELECT MIN(rowid) FROM data GROUP BY series_id, year, period
+    )
+"""
+
+def create_http_session() -> requests.Session:
+    """Creates an HTTP session that reuses its connection to the BLS server and asks for gzip-compressed responses."""
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip'
+    return session
+
+def iter_rows_from_url(session: requests.Session, url: str, separator: str = '\t'):
     """ 
-    Read text data from a provided URL.
+    Download a text file from a provided URL and iterate over its rows.
 
     Parameters:
+        session (requests.Session): HTTP session used to download the file.
         url (str): URL of the text file containing the data.
+        separator (str): Separator character used in the text data.
 
-    Returns:
-        str: The function returns a string of text data if it is successfully read from the URL. If there is an error, the function returns None.
+    Yields:
+        tuple: The fields of each non-blank line, including the header line, decoded as UTF-8. Errors opening or reading the URL,
+        including the server not responding for HTTP_TIMEOUT seconds, are raised to the caller.
+
+    Notes:
+        The response is spooled to a temporary file and memory-mapped, so lines are read one at a time as bytes
+        and each is decoded once before being split, instead of materializing the whole file as a Python string.
     """
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read()
-            text = data.decode('utf-8')
-            return text
-    except Exception as e:
-        print(f'Error: {e}')
-        return None
+    with session.get(url, stream=True, timeout=HTTP_TIMEOUT) as response, tempfile.TemporaryFile() as tf:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=1 << 20):
+            tf.write(chunk)
+        tf.flush()
+        if tf.tell() == 0:
+            return
+        with mmap.mmap(tf.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                if line.strip():
+                    yield tuple(line.decode('utf-8').rstrip('\r\n').split(separator))
 
-def text_to_df(text: str, separator: str = '\t') -> pd.DataFrame:
-    """ 
-    Convert text data to a pandas DataFrame object.
+def read_rows_from_url(url: str, separator: str = '\t') -> list:
+    """Read all rows of text data from a provided URL. Meant for the small files that are downloaded concurrently,
+    so each call uses its own HTTP session instead of sharing one across threads."""
+    with create_http_session() as session:
+        return list(iter_rows_from_url(session, url, separator))
+
+def iter_data_rows(rows):
+    """
+    Generate rows for the data table directly from the fields of the data file.
 
     Parameters:
-        text (str): Text data to be converted to a DataFrame.
-        separator (str): Separator character used in the text data.
+        rows (iterable): Tuples of fields of the data file, excluding the header line.
+
+    Yields:
+        tuple: One row per data line, ordered as id, series_id, prefix, seasonal, periodicity, area_code, item_code, year, period, value, footnote_codes.
+        The year and value are converted to int and float so SQLite binds them as native numbers. Text fields are
+        kept exactly as read (series_id keeps its padding) so they match rows stored by earlier loads.
+    """
+    for i, (series_id, year, period, value, *footnote_codes) in enumerate(rows, start=1):
+        footnote_codes = footnote_codes[0] if footnote_codes else ''
+        yield (
+            i, series_id, series_id[:2], series_id[2:3], series_id[3:4], series_id[4:8], series_id[8:].strip(),
+            int(year), period, float(value) if value.strip() else None, footnote_codes or None,
+        )
+
+def chunked(iterable, n: int):
+    """Yields lists of up to `n` items from `iterable` without materializing the whole iterable."""
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+@lru_cache(maxsize=None)
+def build_insert_query(insert_verb: str, table_name: str, n_columns: int, n_rows: int, columns: tuple = None) -> str:
+    """Builds an INSERT statement with `n_rows` grouped VALUES tuples of `n_columns` placeholders each."""
+    values = ','.join(['(' + ','.join('?' * n_columns) + ')'] * n_rows)
+    target = f"{table_name} ({','.join(columns)})" if columns else table_name
+    return f"{insert_verb} INTO {target} VALUES {values}"
+
+def insert_rows(cursor: sqlite3.Cursor, insert_verb: str, table_name: str, n_columns: int, rows, columns: tuple = None) -> int:
+    """
+    Insert rows to a SQLite database table using multi-row VALUES statements.
+
+    Parameters:
+        cursor (sqlite3.Cursor): Cursor of the SQLite database connection.
+        insert_verb (str): Either 'INSERT' or 'INSERT OR IGNORE'.
+        table_name (str): Name of the SQLite database table to insert the data.
+        n_columns (int): Number of values in each row.
+        rows (iterable): Tuples of values to insert.
+        columns (tuple): Names of the columns the values are inserted to. If omitted, the values are inserted in table column order.
 
     Returns:
-        pandas.DataFrame: The function returns a pandas DataFrame object if it successfully converts the text data. If there is an error, the function returns None.
+        int: The number of records inserted.
+
+    Notes:
+        Each statement carries up to ROWS_PER_STATEMENT rows, capped so its placeholders stay within SQLite's
+        variable limit. The full-size statement and the shorter one for the last batch are each built once and
+        then reused from sqlite3's statement cache. A row that does not have exactly `n_columns` values raises
+        ValueError, so the caller's transaction is rolled back instead of values shifting into the next row.
     """
-    try:
-        df = pd.read_csv(StringIO(text), sep=separator)
-        df = df.rename(columns=lambda x: x.strip())
-        return df
-    except Exception as e:
-        print(f'Error: {e}')
-        return None
-
-def get_data_cols(data: pd.DataFrame) -> pd.DataFrame:
-    """Breaks down the series_id column of the data table into codes that can be used to join to other tables."""
-    data['id'] = data.index + 1
-    data['prefix'] = data['series_id'].apply(lambda x: x[:2])
-    data['seasonal'] = data['series_id'].apply(lambda x: x[2:3])
-    data['periodicity'] = data['series_id'].apply(lambda x: x[3:4])
-    data['area_code'] = data['series_id'].apply(lambda x: x[4:8])
-    data['item_code'] = data['series_id'].apply(lambda x: x[8:].strip())
-    return data
-
-def arrange_data_cols(data: pd.DataFrame, cols: list) -> pd.DataFrame:
-    """Re-arranges columns using a list of column names"""
-    return data[cols]
+    rows_per_statement = max(1, min(ROWS_PER_STATEMENT, MAX_VARIABLE_NUMBER // n_columns))
+    inserted = 0
+    for batch in chunked(rows, rows_per_statement):
+        for row in batch:
+            if len(row) != n_columns:
+                raise ValueError(f"Expected {n_columns} values per row for the {table_name} table, got {len(row)}: {row}")
+        insert_query = build_insert_query(insert_verb, table_name, n_columns, len(batch), columns)
+        cursor.execute(insert_query, list(chain.from_iterable(batch)))
+        inserted += cursor.rowcount
+    return inserted
 
 def create_sqlite_connection(db_file: str) -> sqlite3.Connection:
     """Creates a database connection to a SQLite database.
@@ -66,77 +136,173 @@ def create_sqlite_connection(db_file: str) -> sqlite3.Connection:
 
     Returns:
         conn (sqlite3.Connection): A connection object representing the database. If the database file specified by `db_file` does not exist, a new file will be created.
+
+    Notes:
+        The connection is opened in autocommit mode and tuned for bulk loading (relaxed synchronous, in-memory
+        temp store, large page cache that is not spilled mid-transaction, exclusive lock). Callers are expected
+        to wrap their inserts in an explicit transaction. The rollback journal is kept (and a database left in
+        WAL mode is switched back) because WAL mode is stored in the file and cannot be read from a read-only
+        location.
     """
     conn = None
     try: 
-        conn = sqlite3.connect(db_file)
+        conn = sqlite3.connect(db_file, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-200000')
+        conn.execute('PRAGMA cache_spill=0')
+        conn.execute('PRAGMA locking_mode=EXCLUSIVE')
         print('Opened database successfully')
         return conn
     except sqlite3.Error as e:
         print(e)
 
-def insert_non_data_table(conn: sqlite3.Connection, url: str, table_name: str, separator: str) -> None:
+def insert_non_data_table(cursor: sqlite3.Cursor, rows: list, table_name: str) -> None:
     """ 
-    Insert data from a text file located at the provided URL to a SQLite database table.
+    Insert data from the rows of a text file to a SQLite database table.
 
     Parameters:
-        conn (sqlite3.Connection): Connection object to the SQLite database.
-        url (str): URL of the text file containing the data.
+        cursor (sqlite3.Cursor): Cursor of the SQLite database connection, inside an open transaction.
+        rows (list): Tuples of fields of the text file containing the data, including the header line.
         table_name (str): Name of the SQLite database table to insert the data.
-        data_cols (list): List of column names to select from the data file.
-        separator (str): Separator character used in the data file.
 
     Returns:
         Inserts data to the specified SQLite database table and prints the number of records inserted to the console.
+
+    Notes:
+        Errors are raised to the caller, which is responsible for committing or rolling back the transaction.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is not None:
+        inserted = insert_rows(cursor, 'INSERT OR IGNORE', table_name, len(header), rows)
+        print(f"Inserted {inserted} records to the {table_name} table.")
+    else:
+        print(f"The text file for the {table_name} table is empty.")
+
+def insert_non_data_tables(cursor: sqlite3.Cursor, tables: list, separator: str) -> None:
+    """ 
+    Insert data from several text files to their SQLite database tables in a single transaction.
+
+    Parameters:
+        cursor (sqlite3.Cursor): Cursor of the SQLite database connection.
+        tables (list): List of (url, table_name) tuples to insert.
+        separator (str): Separator character used in the data files.
+
+    Returns:
+        Inserts data to the specified SQLite database tables. If any table fails, none of them are updated.
+
+    Notes:
+        The files are downloaded concurrently before the transaction is opened; the inserts themselves run serially.
     """
     try:
-        text = read_text_from_url(url)
-        if text:
-            rows = text.strip().split('\n')
-            rows = [row.split(separator) for row in rows[1:]]
-            
-            with conn:
-                cursor = conn.cursor()
-                
-                insert_query = f""" 
-                    INSERT OR IGNORE INTO {table_name} VALUES ({','.join('?' * len(rows[0]))})
-                """
-                cursor.executemany(insert_query, rows)
-                print(f"Inserted {cursor.rowcount} records to the table.")
-        else:
-            print("Unable to read the text file from URL.")
+        with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+            downloads = list(executor.map(partial(read_rows_from_url, separator=separator), [url for url, _ in tables]))
+
+        cursor.execute('BEGIN IMMEDIATE')
+        for rows, (_, table_name) in zip(downloads, tables):
+            insert_non_data_table(cursor=cursor, rows=rows, table_name=table_name)
+        cursor.connection.commit()
     except Exception as e:
+        cursor.connection.rollback()
         print(f'Error: {e}')
 
-def insert_data_table(conn: sqlite3.Connection, url: str, table_name: str, data_cols: list, separator: str) -> None: 
+def insert_data_table(cursor: sqlite3.Cursor, session: requests.Session, url: str, table_name: str, data_cols: tuple, separator: str, ignore_conflicts: bool = True) -> None: 
     """
     Insert data from a text file located at the provided URL to a SQLite database table.
 
     Parameters:
-        conn (sqlite3.Connection): Connection object to the SQLite database.
+        cursor (sqlite3.Cursor): Cursor of the SQLite database connection.
+        session (requests.Session): HTTP session used to download the file.
         url (str): URL of the text file containing the data.
         table_name (str): Name of the SQLite database table to insert the data.
-        data_cols (list): List of column names to select from the data file.
+        data_cols (tuple): Column names of the rows generated from the data file, such as DATA_COLS.
         separator (str): Separator character used in the data file.
+        ignore_conflicts (bool): Whether to skip rows that already exist in the table. Can be disabled for the initial load into an empty table.
 
     Returns:
         Inserts data to the specified SQLite database table.
     """
     try:
-        text = read_text_from_url(url)
-        if text:
-            data = text_to_df(text, separator=separator)
-            data = get_data_cols(data)
-            data = arrange_data_cols(data, data_cols)
-            data.to_sql(table_name, conn, if_exists='append', index=False)
+        rows = iter_rows_from_url(session, url, separator=separator)
+        if next(rows, None) is not None:
+            cursor.execute('BEGIN IMMEDIATE')
+
+            insert_verb = 'INSERT OR IGNORE' if ignore_conflicts else 'INSERT'
+            inserted = insert_rows(cursor, insert_verb, table_name, len(data_cols), iter_data_rows(rows), columns=tuple(data_cols))
+            cursor.connection.commit()
+            print(f"Inserted {inserted} records to the {table_name} table.")
         else:
-            print("Unable to read text file from URL.")
+            print("The text file from URL is empty.")
+    except Exception as e:
+        cursor.connection.rollback()
+        print(f'Error: {e}')
+
+
+def is_table_empty(cursor: sqlite3.Cursor, table_name: str) -> bool:
+    """Checks whether a table has no rows without counting all of them."""
+    cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1")
+    return cursor.fetchone() is None
+
+
+def has_unique_constraint(cursor: sqlite3.Cursor, table_name: str) -> bool:
+    """Checks whether a table has an inline UNIQUE constraint, as the data table had in databases created by older versions of create_db.py."""
+    cursor.execute(f"PRAGMA index_list({table_name})")
+    return any(origin == 'u' for _, _, _, origin, _ in cursor.fetchall())
+
+
+def drop_indexes(cursor: sqlite3.Cursor) -> None:
+    """Drops the indexes on the data table so an initial bulk load does not maintain them row by row."""
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        for index_name in DATA_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+        cursor.connection.commit()
+        print(f"Dropped {len(DATA_INDEXES)} indexes on the data table.")
+    except Exception as e:
+        cursor.connection.rollback()
+        print(f'Error: {e}')
+
+
+def create_indexes(cursor: sqlite3.Cursor) -> None:
+    """Creates the unique and secondary indexes on the data table used for de-duplication and by data_view.
+
+    Notes:
+        The indexes are created after the data has been inserted so SQLite builds them once instead of
+        maintaining them on every inserted row. Since the initial load skips conflict checks, rows repeating
+        a (series_id, year, period) are removed, keeping the first one as INSERT OR IGNORE would, before the
+        unique index is built. The unique index is skipped when the table already has the equivalent inline
+        UNIQUE constraint. Errors are printed rather than raised.
+    """
+    try:
+        index_queries = dict(DATA_INDEXES)
+        if has_unique_constraint(cursor, 'data'):
+            del index_queries['idx_series_year_period']
+
+        cursor.execute('BEGIN IMMEDIATE')
+        for query in index_queries.values():
+            try:
+                cursor.execute(query)
+            except sqlite3.IntegrityError:
+                cursor.execute(DEDUPLICATE_DATA_QUERY)
+                print(f"Removed {cursor.rowcount} duplicate records from the data table.")
+                cursor.execute(query)
+        cursor.connection.commit()
+        print(f"Created {len(index_queries)} indexes on the data table.")
     except Exception as e:
+        cursor.connection.rollback()
         print(f'Error: {e}')
 
 
-def create_view(conn: sqlite3.Connection) -> None:
-    """Creates a custom view using the 4 existing tables."""
+def create_view(cursor: sqlite3.Cursor) -> None:
+    """Creates a custom view using the 4 existing tables and materializes it as the indexed data_denorm table.
+
+    Notes:
+        The data is static between updates, so the joins are paid once here and queries against data_denorm
+        only need a range scan on its (area_code, item_code) index.
+        The view and table are rebuilt in one transaction, so a failure keeps the previous ones.
+    """
     view_query = """
         CREATE VIEW data_view AS 
             SELECT 
@@ -150,13 +316,22 @@ def create_view(conn: sqlite3.Connection) -> None:
             LEFT JOIN periods p ON
                 p.period = d.period
     """
-    with conn:
-        cursor = conn.cursor() 
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
         cursor.execute("DROP VIEW IF EXISTS data_view")
         cursor.execute(view_query)
-        cursor.execute("SELECT COUNT(*) FROM data_view")
+        cursor.execute("SELECT COUNT(*) FROM data")
         rows = cursor.fetchone()[0]
+
+        cursor.execute("DROP TABLE IF EXISTS data_denorm")
+        cursor.execute("CREATE TABLE data_denorm AS SELECT * FROM data_view")
+        cursor.execute("CREATE INDEX idx_denorm_area_item ON data_denorm (area_code, item_code)")
+        cursor.connection.commit()
         print(f"Created view with {rows} records.")
+        print("Created data_denorm table from the view.")
+    except Exception as e:
+        cursor.connection.rollback()
+        print(f'Error: {e}')
 
 
 def update_db(db_file):
@@ -165,15 +340,27 @@ def update_db(db_file):
     item_codes = 'cu.item'
     period_codes = 'cu.period'
     data_file = 'cu.data.0.Current'
-    data_cols = ['id', 'series_id', 'prefix', 'seasonal', 'periodicity', 'area_code', 'item_code', 'year', 'period', 'value', 'footnote_codes']
 
     conn = create_sqlite_connection(db_file)
     if conn:
-        insert_non_data_table(conn=conn, url=base_url+area_codes, table_name='areas', separator='\t')
-        insert_non_data_table(conn=conn, url=base_url+period_codes, table_name='periods', separator='\t')
-        insert_non_data_table(conn=conn, url=base_url+item_codes, table_name='items', separator='\t')
-        insert_data_table(conn=conn, url=base_url+data_file, table_name='data', data_cols=data_cols, separator='\t')
-        create_view(conn)
+        cursor = conn.cursor()
+        session = create_http_session()
+        non_data_tables = [
+            (base_url+area_codes, 'areas'),
+            (base_url+period_codes, 'periods'),
+            (base_url+item_codes, 'items'),
+        ]
+        insert_non_data_tables(cursor=cursor, tables=non_data_tables, separator='\t')
+        initial_load = is_table_empty(cursor, 'data') and not has_unique_constraint(cursor, 'data')
+        if initial_load:
+            drop_indexes(cursor)
+        insert_data_table(cursor=cursor, session=session, url=base_url+data_file, table_name='data', data_cols=DATA_COLS, separator='\t', ignore_conflicts=not initial_load)
+        create_indexes(cursor)
+        create_view(cursor)
+        cursor.execute("PRAGMA analysis_limit=1000")
+        cursor.execute("ANALYZE")
+        cursor.execute("PRAGMA optimize")
+        session.close()
         conn.close()
 
 